@@ -1,14 +1,23 @@
 from __future__ import annotations
 
+import functools
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Final
+
+__all__ = ["AppConfig", "get_config"]
+
+
+_TRUTHY = frozenset({"1", "true", "yes", "y", "on"})
 
 
 def _env_bool(name: str, default: bool) -> bool:
     value = os.getenv(name)
-    if value is None:
-        return default
-    return value.strip().lower() in {"1", "true", "yes", "y", "on"}
+    return default if value is None else value.strip().lower() in _TRUTHY
+
+
+# Parsed once here because two fields derive from it.
+_CONNECT_TIMEOUT_SECONDS: Final[float] = float(os.getenv("CONNECT_TIMEOUT_SECONDS", "1"))
 
 
 @dataclass(frozen=True)
@@ -18,13 +27,11 @@ class AppConfig:
     # Użytkownik może to nadpisać przez UI (zapisywane w SQLite).
     connect_target: str = os.getenv("CONNECT_TARGET", "google.com")
     connect_default_port: int = int(os.getenv("CONNECT_DEFAULT_PORT", "443"))
-    connect_timeout_seconds: float = float(os.getenv("CONNECT_TIMEOUT_SECONDS", "1"))
+    connect_timeout_seconds: float = _CONNECT_TIMEOUT_SECONDS
     # Próg (ms), po przekroczeniu którego ping uznajemy za timeout/awarię.
     # Steruje też twardym timeoutem połączenia TCP. Użytkownik może nadpisać przez UI.
     # Domyślnie pochodna od CONNECT_TIMEOUT_SECONDS (kompatybilność wsteczna).
-    ping_timeout_ms: int = int(
-        os.getenv("PING_TIMEOUT_MS", str(int(float(os.getenv("CONNECT_TIMEOUT_SECONDS", "1")) * 1000)))
-    )
+    ping_timeout_ms: int = int(os.getenv("PING_TIMEOUT_MS", str(int(_CONNECT_TIMEOUT_SECONDS * 1000))))
     connect_interval_seconds: float = float(os.getenv("CONNECT_INTERVAL_SECONDS", "5"))
     connectivity_check_buffer_seconds: float = float(os.getenv("CONNECTIVITY_CHECK_BUFFER_SECONDS", "600"))
     connectivity_check_buffer_max: int = int(os.getenv("CONNECTIVITY_CHECK_BUFFER_MAX", "300"))
@@ -35,6 +42,8 @@ class AppConfig:
     speedtest_interval_seconds: float = float(os.getenv("SPEEDTEST_INTERVAL_SECONDS", "900"))
     speedtest_timeout_seconds: float = float(os.getenv("SPEEDTEST_TIMEOUT_SECONDS", "10"))
     speedtest_skip_if_offline: bool = _env_bool("SPEEDTEST_SKIP_IF_OFFLINE", True)
+    # Równoległe połączenia HTTP(S) przy teście z URL (jeden strumień TCP nie nasyca szybkich łączy).
+    speedtest_parallel_connections: int = int(os.getenv("SPEEDTEST_PARALLEL_CONNECTIONS", "4"))
 
     # SMTP configuration for email notifications (all optional).
     smtp_host: str | None = os.getenv("SMTP_HOST") or None
@@ -50,10 +59,20 @@ class AppConfig:
     telemetry_timeout_seconds: float = float(os.getenv("TELEMETRY_TIMEOUT_SECONDS", "2"))
     telemetry_default_enabled: bool = _env_bool("TELEMETRY_DEFAULT_ENABLED", True)
 
-    @property
-    def smtp_enabled(self) -> bool:
-        return bool(self.smtp_host and self.smtp_user and self.smtp_password and self.smtp_to)
+    # Derived once in __post_init__ (frozen dataclass, so no cached_property).
+    smtp_enabled: bool = field(init=False)
+    db_path: str = field(init=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self,
+            "smtp_enabled",
+            bool(self.smtp_host and self.smtp_user and self.smtp_password and self.smtp_to),
+        )
+        object.__setattr__(self, "db_path", os.path.join(self.data_dir, "app.db"))
+
 
-    @property
-    def db_path(self) -> str:
-        return os.path.join(self.data_dir, "app.db")
+@functools.lru_cache(maxsize=1)
+def get_config() -> AppConfig:
+    """Process-wide AppConfig; environment is read once per process."""
+    return AppConfig()
@@ -1,9 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import socket
+import time
 from urllib.parse import urlparse
 
+_ADDR_TTL_SECONDS = 300.0
+# (host, port) -> (resolved_at_monotonic, getaddrinfo result)
+_addr_cache: dict[tuple[str, int], tuple[float, list]] = {}
 
+
+@functools.lru_cache(maxsize=32)
 def resolve_target(target: str, default_port: int) -> tuple[str, int]:
     t = (target or "").strip()
     if not t:
@@ -27,14 +35,36 @@ def resolve_target(target: str, default_port: int) -> tuple[str, int]:
     return (t, default_port)
 
 
-def tcp_connectivity_check(host: str, port: int, timeout_seconds: float) -> bool:
+async def _resolve(host: str, port: int) -> list:
+    key = (host, port)
+    cached = _addr_cache.get(key)
+    if cached is not None and (time.monotonic() - cached[0]) < _ADDR_TTL_SECONDS:
+        return cached[1]
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    _addr_cache[key] = (time.monotonic(), infos)
+    return infos
+
+
+async def tcp_connectivity_check_async(host: str, port: int, timeout_seconds: float) -> bool:
     try:
-        with socket.create_connection((host, port), timeout=timeout_seconds):
-            return True
+        infos = await _resolve(host, port)
     except OSError:
         return False
+    loop = asyncio.get_running_loop()
+    for family, socktype, proto, _, sockaddr in infos:
+        with socket.socket(family, socktype, proto) as sock:
+            sock.setblocking(False)
+            try:
+                await asyncio.wait_for(loop.sock_connect(sock, sockaddr), timeout=timeout_seconds)
+                return True
+            except OSError:  # includes TimeoutError
+                continue
+    # Nothing answered: drop the cached addresses so a moved host is re-resolved.
+    _addr_cache.pop((host, port), None)
+    return False
 
 
-def check_target(target: str, default_port: int, timeout_seconds: float) -> bool:
+async def check_target_async(target: str, default_port: int, timeout_seconds: float) -> bool:
+    """TCP connect probe run on the event loop (no worker-thread hop per check)."""
     host, port = resolve_target(target, default_port=default_port)
-    return tcp_connectivity_check(host, port, timeout_seconds)
+    return await tcp_connectivity_check_async(host, port, timeout_seconds)
@@ -2,17 +2,138 @@ from __future__ import annotations
 
 import os
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import datetime, timezone
-from typing import Iterator
-
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator, Sequence
+
+
+# v2: timestamps stored as INTEGER microseconds since the epoch (*_us columns)
+# instead of ISO-8601 TEXT. Helpers still accept and return ISO strings.
+SCHEMA_VERSION = 2
+# Bumped whenever ensure_db gains an index, so existing databases get it on next start.
+INDEX_VERSION = 1
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_US = timedelta(microseconds=1)
+
+
+def _iso_col(name: str) -> str:
+    """SELECT expression rendering `<name>_us` back as ISO-8601 UTC (ms precision)."""
+    return f"strftime('%Y-%m-%dT%H:%M:%fZ', {name}_us / 1000000.0, 'unixepoch') AS {name}"
+
+
+_SQL_CURRENT_PERIOD = f"""
+    SELECT id, {_iso_col("started_at")}, {_iso_col("ended_at")}, is_up
+    FROM connectivity_periods
+    WHERE ended_at_us IS NULL
+    ORDER BY id DESC
+    LIMIT 1
+"""
+_SQL_INSERT_PERIOD = "INSERT INTO connectivity_periods(started_at_us, ended_at_us, is_up) VALUES (?,?,?)"
+_SQL_CLOSE_PERIOD = "UPDATE connectivity_periods SET ended_at_us = ? WHERE id = ?"
+_SQL_INSERT_CHECK = "INSERT INTO connectivity_checks(checked_at_us, is_up, latency_ms) VALUES (?,?,?)"
+_SQL_INSERT_SPEED_TEST = """
+    INSERT INTO speed_tests(
+      started_at_us, duration_seconds, bytes_downloaded, mbps, error,
+      speedtest_mode, upload_mbps, ping_ms, server_name, server_country
+    )
+    VALUES (?,?,?,?,?,?,?,?,?,?)
+"""
+_SPEED_TEST_FIELDS = """duration_seconds, bytes_downloaded, mbps, error,
+           speedtest_mode, upload_mbps, ping_ms, server_name, server_country"""
+_SPEED_TEST_COLUMNS = f"""{_iso_col("started_at")}, {_SPEED_TEST_FIELDS}"""
+_SQL_LAST_SPEED_TEST = f"""
+    SELECT id, {_SPEED_TEST_COLUMNS}
+    FROM speed_tests
+    ORDER BY id DESC
+    LIMIT 1
+"""
+_SQL_LAST_SUCCESS_SPEED_TEST = f"""
+    SELECT id, {_SPEED_TEST_COLUMNS}
+    FROM speed_tests
+    WHERE error IS NULL
+    ORDER BY id DESC
+    LIMIT 1
+"""
+_SQL_QUERY_SPEED_TESTS = f"""
+    SELECT {_SPEED_TEST_COLUMNS}
+    FROM speed_tests
+    WHERE started_at_us >= ? AND started_at_us <= ?
+    ORDER BY started_at_us ASC
+"""
+_SQL_QUERY_CHECKS = f"""
+    SELECT {_iso_col("checked_at")}, is_up, latency_ms
+    FROM connectivity_checks
+    WHERE checked_at_us >= ? AND checked_at_us <= ?
+    ORDER BY checked_at_us ASC
+"""
+
+_CREATE_TABLES: dict[str, str] = {
+    "connectivity_periods": """
+        CREATE TABLE IF NOT EXISTS connectivity_periods (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          started_at_us INTEGER NOT NULL,
+          ended_at_us INTEGER NULL,
+          is_up INTEGER NOT NULL CHECK (is_up IN (0,1))
+        )
+    """,
+    "connectivity_checks": """
+        CREATE TABLE IF NOT EXISTS connectivity_checks (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          checked_at_us INTEGER NOT NULL,
+          is_up INTEGER NOT NULL CHECK (is_up IN (0,1)),
+          latency_ms REAL NULL
+        )
+    """,
+    "speed_tests": """
+        CREATE TABLE IF NOT EXISTS speed_tests (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          started_at_us INTEGER NOT NULL,
+          duration_seconds REAL NOT NULL,
+          bytes_downloaded INTEGER NOT NULL,
+          mbps REAL NOT NULL,
+          error TEXT NULL,
+          speedtest_mode TEXT NULL,
+          upload_mbps REAL NULL,
+          ping_ms REAL NULL,
+          server_name TEXT NULL,
+          server_country TEXT NULL
+        )
+    """,
+    "blocked_periods": """
+        CREATE TABLE IF NOT EXISTS blocked_periods (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          test_type TEXT NOT NULL CHECK (test_type IN ('ping', 'speed')),
+          started_at_us INTEGER NOT NULL,
+          ended_at_us INTEGER NULL,
+          reason TEXT NOT NULL CHECK (reason IN ('disabled', 'schedule'))
+        )
+    """,
+}
 
-SCHEMA_VERSION = 1
+# Schema v1 TEXT timestamp columns, rewritten to `<name>_us` by the migration.
+_LEGACY_TIME_COLUMNS: dict[str, tuple[str, ...]] = {
+    "connectivity_periods": ("started_at", "ended_at"),
+    "connectivity_checks": ("checked_at",),
+    "speed_tests": ("started_at",),
+    "blocked_periods": ("started_at", "ended_at"),
+}
 
 
 def _utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    # Only settings.updated_at is still stored as text (timestamps are *_us integers
+    # since schema v2); fixed-width with microseconds to keep the stored format stable.
+    d = datetime.now(timezone.utc)
+    return "%04d-%02d-%02dT%02d:%02d:%02d.%06dZ" % (
+        d.year, d.month, d.day, d.hour, d.minute, d.second, d.microsecond,
+    )
+
+
+def _utc_now_us() -> int:
+    return time.time_ns() // 1000
 
 
 def _parse_utc_iso(value: str) -> datetime:
@@ -23,27 +144,97 @@ def _parse_utc_iso(value: str) -> datetime:
     return dt.astimezone(timezone.utc)
 
 
-def _connect(db_path: str) -> sqlite3.Connection:
-    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+def _iso_to_us(value: str | None) -> int | None:
+    if value is None:
+        return None
+    return (_parse_utc_iso(value) - _EPOCH) // _ONE_US
+
+
+def _connect(db_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        db_path,
+        timeout=30,
+        isolation_level=None,
+        cached_statements=256,
+        check_same_thread=check_same_thread,
+    )
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL;")
     conn.execute("PRAGMA synchronous=NORMAL;")
     conn.execute("PRAGMA foreign_keys=ON;")
+    conn.execute("PRAGMA wal_autocheckpoint=2000;")
+    conn.execute("PRAGMA mmap_size=134217728;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA cache_size=-20000;")
     return conn
 
 
-@contextmanager
-def db_conn(db_path: str) -> Iterator[sqlite3.Connection]:
-    conn = _connect(db_path)
+def _iter_rows(cur: sqlite3.Cursor) -> Iterator[sqlite3.Row]:
+    """Yield rows in fetchmany() batches instead of one big fetchall()."""
+    cur.arraysize = 512
+    for chunk in iter(cur.fetchmany, []):
+        yield from chunk
+
+
+def _stream_rows(db_path: str, sql: str, params: tuple) -> Iterator[sqlite3.Row]:
+    """Like _iter_rows, but on a dedicated connection owned by the generator.
+
+    Streaming responses pull the next item from arbitrary threadpool threads,
+    so the thread-local connection cannot be used; this one is opened with
+    check_same_thread=False (access stays sequential) and closed when the
+    generator finishes or is discarded.
+    """
+    conn = _connect(db_path, check_same_thread=False)
     try:
-        yield conn
+        yield from _iter_rows(conn.execute(sql, params))
     finally:
         conn.close()
 
 
+_tls = threading.local()
+
+
+def get_conn(db_path: str) -> sqlite3.Connection:
+    """Return this thread's cached connection for db_path (opened on first use).
+
+    sqlite3 connections are bound to the creating thread, so the cache is per
+    thread; the connection is closed when the thread-local is collected.
+    """
+    conns: dict[str, sqlite3.Connection] | None = getattr(_tls, "conns", None)
+    if conns is None:
+        conns = _tls.conns = {}
+    conn = conns.get(db_path)
+    if conn is None:
+        conn = conns[db_path] = _connect(db_path)
+    return conn
+
+
+@contextmanager
+def db_conn(db_path: str) -> Iterator[sqlite3.Connection]:
+    yield get_conn(db_path)
+
+
+def _schema_is_current(conn: sqlite3.Connection) -> bool:
+    try:
+        rows = conn.execute(
+            "SELECT key, value FROM meta WHERE key IN ('schema_version', 'schema_columns_v2', 'index_version')"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # First run: meta does not exist yet.
+        return False
+    meta = {r["key"]: r["value"] for r in rows}
+    return (
+        meta.get("schema_version") == str(SCHEMA_VERSION)
+        and meta.get("schema_columns_v2") == "1"
+        and meta.get("index_version") == str(INDEX_VERSION)
+    )
+
+
 def ensure_db(db_path: str) -> None:
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
     with db_conn(db_path) as conn:
+        if _schema_is_current(conn):
+            return
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS meta (
@@ -52,41 +243,13 @@ def ensure_db(db_path: str) -> None:
             )
             """
         )
+        _migrate_timestamps_to_us(conn)
+        conn.execute(_CREATE_TABLES["connectivity_periods"])
+        conn.execute(_CREATE_TABLES["connectivity_checks"])
         conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS connectivity_periods (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              started_at TEXT NOT NULL,
-              ended_at TEXT NULL,
-              is_up INTEGER NOT NULL CHECK (is_up IN (0,1))
-            )
-            """
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS connectivity_checks (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              checked_at TEXT NOT NULL,
-              is_up INTEGER NOT NULL CHECK (is_up IN (0,1)),
-              latency_ms REAL NULL
-            )
-            """
-        )
-        conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_connectivity_checks_checked_at ON connectivity_checks(checked_at)"
-        )
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS speed_tests (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              started_at TEXT NOT NULL,
-              duration_seconds REAL NOT NULL,
-              bytes_downloaded INTEGER NOT NULL,
-              mbps REAL NOT NULL,
-              error TEXT NULL
-            )
-            """
+            "CREATE INDEX IF NOT EXISTS idx_connectivity_checks_checked_at ON connectivity_checks(checked_at_us)"
         )
+        conn.execute(_CREATE_TABLES["speed_tests"])
         _ensure_speed_tests_columns(conn)
         _ensure_blocked_periods_table(conn)
         conn.execute(
@@ -99,30 +262,72 @@ def ensure_db(db_path: str) -> None:
             """
         )
         conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS blocked_periods (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              test_type TEXT NOT NULL CHECK (test_type IN ('ping', 'speed')),
-              started_at TEXT NOT NULL,
-              ended_at TEXT NULL,
-              reason TEXT NOT NULL CHECK (reason IN ('disabled', 'schedule'))
-            )
-            """
+            "CREATE INDEX IF NOT EXISTS idx_speed_tests_started_at ON speed_tests(started_at_us)"
         )
         conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_blocked_periods_started_at ON blocked_periods(started_at)"
+            "CREATE INDEX IF NOT EXISTS idx_connectivity_periods_started_at ON connectivity_periods(started_at_us)"
         )
+        # Partial index: the open period lookup (ended_at_us IS NULL) stays O(1).
         conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_blocked_periods_test_type ON blocked_periods(test_type)"
+            "CREATE INDEX IF NOT EXISTS idx_connectivity_periods_open ON connectivity_periods(id) "
+            "WHERE ended_at_us IS NULL"
         )
+        # Covering index for outage ranges and the downtime report (is_up = 0 + time bounds).
         conn.execute(
-            "INSERT OR IGNORE INTO meta(key, value) VALUES ('schema_version', ?)",
-            (str(SCHEMA_VERSION),),
+            "CREATE INDEX IF NOT EXISTS idx_connectivity_periods_up_started "
+            "ON connectivity_periods(is_up, started_at_us, ended_at_us)"
+        )
+        conn.executemany(
+            """
+            INSERT INTO meta(key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value=excluded.value
+            """,
+            [("schema_version", str(SCHEMA_VERSION)), ("index_version", str(INDEX_VERSION))],
         )
+        # Only reached on first start or after a schema/index upgrade: refresh planner stats.
+        conn.execute("ANALYZE")
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> list[str]:
+    return [r["name"] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def _migrate_timestamps_to_us(conn: sqlite3.Connection) -> bool:
+    """Rebuild schema v1 tables (ISO TEXT timestamps) with INTEGER `*_us` columns."""
+    legacy = [
+        table
+        for table, time_cols in _LEGACY_TIME_COLUMNS.items()
+        if time_cols[0] in _table_columns(conn, table)
+    ]
+    if not legacy:
+        return False
+    if "speed_tests" in legacy:
+        # Old databases may predate the optional speed_tests columns.
+        _ensure_speed_tests_columns(conn)
+
+    conn.create_function("iso_to_us", 1, _iso_to_us, deterministic=True)
+    try:
+        conn.execute("BEGIN")
+        for table in legacy:
+            time_cols = _LEGACY_TIME_COLUMNS[table]
+            cols = _table_columns(conn, table)
+            conn.execute(f"ALTER TABLE {table} RENAME TO {table}_v1")
+            conn.execute(_CREATE_TABLES[table])
+            target = ", ".join(f"{c}_us" if c in time_cols else c for c in cols)
+            source = ", ".join(f"iso_to_us({c})" if c in time_cols else c for c in cols)
+            conn.execute(f"INSERT INTO {table}({target}) SELECT {source} FROM {table}_v1")
+            conn.execute(f"DROP TABLE {table}_v1")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return True
 
 
 def _ensure_speed_tests_columns(conn: sqlite3.Connection) -> None:
-    cols = {r["name"] for r in conn.execute("PRAGMA table_info(speed_tests)").fetchall()}
+    done = conn.execute("SELECT value FROM meta WHERE key = 'schema_columns_v2'").fetchone()
+    if done and done["value"] == "1":
+        return
     desired: list[tuple[str, str]] = [
         ("speedtest_mode", "TEXT"),
         ("upload_mbps", "REAL"),
@@ -130,111 +335,128 @@ def _ensure_speed_tests_columns(conn: sqlite3.Connection) -> None:
         ("server_name", "TEXT"),
         ("server_country", "TEXT"),
     ]
-    for name, ctype in desired:
-        if name in cols:
-            continue
-        conn.execute(f"ALTER TABLE speed_tests ADD COLUMN {name} {ctype} NULL")
+    try:
+        conn.execute("BEGIN")
+        cols = {r["name"] for r in conn.execute("PRAGMA table_info(speed_tests)").fetchall()}
+        for name, ctype in desired:
+            if name in cols:
+                continue
+            conn.execute(f"ALTER TABLE speed_tests ADD COLUMN {name} {ctype} NULL")
+        conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('schema_columns_v2', '1')")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
 
 
 def _ensure_blocked_periods_table(conn: sqlite3.Connection) -> None:
     """Ensure blocked_periods table exists (migration for existing DBs)."""
+    conn.execute(_CREATE_TABLES["blocked_periods"])
     conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS blocked_periods (
-          id INTEGER PRIMARY KEY AUTOINCREMENT,
-          test_type TEXT NOT NULL CHECK (test_type IN ('ping', 'speed')),
-          started_at TEXT NOT NULL,
-          ended_at TEXT NULL,
-          reason TEXT NOT NULL CHECK (reason IN ('disabled', 'schedule'))
-        )
-        """
-    )
-    conn.execute(
-        "CREATE INDEX IF NOT EXISTS idx_blocked_periods_started_at ON blocked_periods(started_at)"
+        "CREATE INDEX IF NOT EXISTS idx_blocked_periods_started_at ON blocked_periods(started_at_us)"
     )
     conn.execute(
         "CREATE INDEX IF NOT EXISTS idx_blocked_periods_test_type ON blocked_periods(test_type)"
     )
 
 
-def get_settings(db_path: str, keys: list[str]) -> dict[str, str]:
+# Whole settings table per db_path, loaded on first read. All writes go through
+# set_setting, which updates SQLite and then this cache.
+_settings_cache: dict[str, dict[str, str]] = {}
+_settings_lock = threading.Lock()
+
+
+def _load_settings(db_path: str) -> dict[str, str]:
+    cache = _settings_cache.get(db_path)
+    if cache is None:
+        with db_conn(db_path) as conn:
+            rows = conn.execute("SELECT key, value FROM settings").fetchall()
+        cache = _settings_cache[db_path] = {r["key"]: r["value"] for r in rows}
+    return cache
+
+
+def maintenance(db_path: str) -> None:
+    """Periodic housekeeping: truncate the WAL and refresh planner statistics."""
+    with db_conn(db_path) as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        conn.execute("PRAGMA optimize;")
+
+
+def get_settings(db_path: str, keys: Sequence[str]) -> dict[str, str]:
     if not keys:
         return {}
-    placeholders = ",".join(["?"] * len(keys))
-    with db_conn(db_path) as conn:
-        rows = conn.execute(
-            f"SELECT key, value FROM settings WHERE key IN ({placeholders})",
-            tuple(keys),
-        ).fetchall()
-        return {r["key"]: r["value"] for r in rows}
+    with _settings_lock:
+        cache = _load_settings(db_path)
+        return {k: cache[k] for k in keys if k in cache}
+
+
+_SQL_UPSERT_SETTING = """
+    INSERT INTO settings(key, value, updated_at)
+    VALUES (?,?,?)
+    ON CONFLICT(key) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at
+"""
 
 
 def set_setting(db_path: str, key: str, value: str, now_iso: str | None = None) -> None:
     now_iso = now_iso or _utc_now_iso()
-    with db_conn(db_path) as conn:
-        conn.execute(
-            """
-            INSERT INTO settings(key, value, updated_at)
-            VALUES (?,?,?)
-            ON CONFLICT(key) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at
-            """,
-            (key, value, now_iso),
-        )
+    with _settings_lock:
+        with db_conn(db_path) as conn:
+            conn.execute(_SQL_UPSERT_SETTING, (key, value, now_iso))
+        cache = _settings_cache.get(db_path)
+        if cache is not None:
+            cache[key] = value
 
 
-def ensure_default_setting(db_path: str, key: str, value: str) -> None:
-    with db_conn(db_path) as conn:
-        row = conn.execute("SELECT 1 FROM settings WHERE key = ? LIMIT 1", (key,)).fetchone()
-        if row:
-            return
-    set_setting(db_path, key, value)
+def set_settings_bulk(db_path: str, values: dict[str, str], now_iso: str | None = None) -> None:
+    """Write several settings in one transaction (one commit instead of one per key)."""
+    if not values:
+        return
+    now_iso = now_iso or _utc_now_iso()
+    with _settings_lock:
+        with db_conn(db_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(_SQL_UPSERT_SETTING, [(k, v, now_iso) for k, v in values.items()])
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        cache = _settings_cache.get(db_path)
+        if cache is not None:
+            cache.update(values)
 
 
-def get_current_connectivity_period(db_path: str):
+def bootstrap_db(db_path: str, defaults: dict[str, str]) -> None:
+    """ensure_db plus all missing default settings, written with one statement."""
+    ensure_db(db_path)
+    if not defaults:
+        return
+    now_iso = _utc_now_iso()
+    placeholders = ", ".join(["(?,?,?)"] * len(defaults))
+    params = [p for k, v in defaults.items() for p in (k, v, now_iso)]
+    with _settings_lock:
+        with db_conn(db_path) as conn:
+            # Single multi-row statement: one bind + one implicit commit for all defaults.
+            conn.execute(f"INSERT OR IGNORE INTO settings(key, value, updated_at) VALUES {placeholders}", params)
+        # Reload on next read; ignored inserts mean the DB values win over `defaults`.
+        _settings_cache.pop(db_path, None)
+
+
+def get_current_connectivity_period(db_path: str) -> sqlite3.Row | None:
     with db_conn(db_path) as conn:
-        row = conn.execute(
-            """
-            SELECT id, started_at, ended_at, is_up
-            FROM connectivity_periods
-            WHERE ended_at IS NULL
-            ORDER BY id DESC
-            LIMIT 1
-            """
-        ).fetchone()
-        return dict(row) if row else None
+        row = conn.execute(_SQL_CURRENT_PERIOD).fetchone()
+        return row
 
 
 def record_connectivity(db_path: str, is_up: bool, now_iso: str | None = None) -> None:
-    now_iso = now_iso or _utc_now_iso()
+    now_us = _iso_to_us(now_iso) if now_iso else _utc_now_us()
     with db_conn(db_path) as conn:
-        current = conn.execute(
-            """
-            SELECT id, is_up
-            FROM connectivity_periods
-            WHERE ended_at IS NULL
-            ORDER BY id DESC
-            LIMIT 1
-            """
-        ).fetchone()
+        current = conn.execute(_SQL_CURRENT_PERIOD).fetchone()
         if current is None:
-            conn.execute(
-                "INSERT INTO connectivity_periods(started_at, ended_at, is_up) VALUES (?,?,?)",
-                (now_iso, None, 1 if is_up else 0),
-            )
-            return
-
-        current_is_up = bool(current["is_up"])
-        if current_is_up == is_up:
-            return
-
-        conn.execute(
-            "UPDATE connectivity_periods SET ended_at = ? WHERE id = ?",
-            (now_iso, current["id"]),
-        )
-        conn.execute(
-            "INSERT INTO connectivity_periods(started_at, ended_at, is_up) VALUES (?,?,?)",
-            (now_iso, None, 1 if is_up else 0),
-        )
+            conn.execute(_SQL_INSERT_PERIOD, (now_us, None, 1 if is_up else 0))
+        elif bool(current["is_up"]) != is_up:
+            conn.execute(_SQL_CLOSE_PERIOD, (now_us, current["id"]))
+            conn.execute(_SQL_INSERT_PERIOD, (now_us, None, 1 if is_up else 0))
 
 
 def record_connectivity_check(
@@ -243,12 +465,9 @@ def record_connectivity_check(
     checked_at_iso: str | None = None,
     latency_ms: float | None = None,
 ) -> None:
-    checked_at_iso = checked_at_iso or _utc_now_iso()
+    checked_at_us = _iso_to_us(checked_at_iso) if checked_at_iso else _utc_now_us()
     with db_conn(db_path) as conn:
-        conn.execute(
-            "INSERT INTO connectivity_checks(checked_at, is_up, latency_ms) VALUES (?,?,?)",
-            (checked_at_iso, 1 if is_up else 0, latency_ms),
-        )
+        conn.execute(_SQL_INSERT_CHECK, (checked_at_us, 1 if is_up else 0, latency_ms))
 
 
 def record_connectivity_checks_batch(
@@ -257,14 +476,14 @@ def record_connectivity_checks_batch(
 ) -> None:
     if not rows:
         return
-    values = [(checked_at_iso, 1 if is_up else 0, latency_ms) for checked_at_iso, is_up, latency_ms in rows]
+    values = [
+        (_iso_to_us(checked_at_iso), 1 if is_up else 0, latency_ms)
+        for checked_at_iso, is_up, latency_ms in rows
+    ]
     with db_conn(db_path) as conn:
         try:
             conn.execute("BEGIN")
-            conn.executemany(
-                "INSERT INTO connectivity_checks(checked_at, is_up, latency_ms) VALUES (?,?,?)",
-                values,
-            )
+            conn.executemany(_SQL_INSERT_CHECK, values)
             conn.execute("COMMIT")
         except Exception:
             conn.execute("ROLLBACK")
@@ -286,15 +505,9 @@ def record_speed_test(
 ) -> None:
     with db_conn(db_path) as conn:
         conn.execute(
-            """
-            INSERT INTO speed_tests(
-              started_at, duration_seconds, bytes_downloaded, mbps, error,
-              speedtest_mode, upload_mbps, ping_ms, server_name, server_country
-            )
-            VALUES (?,?,?,?,?,?,?,?,?,?)
-            """,
+            _SQL_INSERT_SPEED_TEST,
             (
-                started_at_iso,
+                _iso_to_us(started_at_iso),
                 duration_seconds,
                 bytes_downloaded,
                 mbps,
@@ -308,33 +521,32 @@ def record_speed_test(
         )
 
 
-def get_last_speed_test(db_path: str):
-    with db_conn(db_path) as conn:
-        row = conn.execute(
-            """
-            SELECT id, started_at, duration_seconds, bytes_downloaded, mbps, error,
-                   speedtest_mode, upload_mbps, ping_ms, server_name, server_country
-            FROM speed_tests
-            ORDER BY id DESC
-            LIMIT 1
-            """
-        ).fetchone()
-        return dict(row) if row else None
+def _dict_row(cur: sqlite3.Cursor, row: tuple) -> dict[str, Any]:
+    return {d[0]: v for d, v in zip(cur.description, row)}
+
+
+StatusRow = dict[str, Any]
 
 
-def get_last_success_speed_test(db_path: str):
+def get_status_rows(db_path: str) -> tuple[StatusRow | None, StatusRow | None, StatusRow | None]:
+    """(current period, last speed test, last successful speed test) from one read snapshot.
+
+    Returned as plain dicts the caller may modify in place (they feed the JSON response).
+    """
     with db_conn(db_path) as conn:
-        row = conn.execute(
-            """
-            SELECT id, started_at, duration_seconds, bytes_downloaded, mbps, error,
-                   speedtest_mode, upload_mbps, ping_ms, server_name, server_country
-            FROM speed_tests
-            WHERE error IS NULL
-            ORDER BY id DESC
-            LIMIT 1
-            """
-        ).fetchone()
-        return dict(row) if row else None
+        cur = conn.cursor()
+        cur.row_factory = _dict_row
+        conn.execute("BEGIN")
+        try:
+            current = cur.execute(_SQL_CURRENT_PERIOD).fetchone()
+            last = cur.execute(_SQL_LAST_SPEED_TEST).fetchone()
+            if last is not None and last["error"] is None:
+                last_ok = last
+            else:
+                last_ok = cur.execute(_SQL_LAST_SUCCESS_SPEED_TEST).fetchone()
+        finally:
+            conn.execute("COMMIT")
+        return current, last, last_ok
 
 
 @dataclass(frozen=True)
@@ -342,117 +554,144 @@ class TimeRange:
     start_iso: str
     end_iso: str
 
+    def as_us(self) -> tuple[int, int]:
+        return _iso_to_us(self.start_iso), _iso_to_us(self.end_iso)
 
-def query_speed_tests(db_path: str, tr: TimeRange):
+
+def query_speed_tests(db_path: str, tr: TimeRange) -> Iterator[sqlite3.Row]:
+    """Speed tests in range, oldest first."""
     with db_conn(db_path) as conn:
-        rows = conn.execute(
-            """
-            SELECT started_at, duration_seconds, bytes_downloaded, mbps, error,
-                   speedtest_mode, upload_mbps, ping_ms, server_name, server_country
-            FROM speed_tests
-            WHERE started_at >= ? AND started_at <= ?
-            ORDER BY started_at ASC
-            """,
-            (tr.start_iso, tr.end_iso),
-        ).fetchall()
-        return [dict(r) for r in rows]
+        yield from _iter_rows(conn.execute(_SQL_QUERY_SPEED_TESTS, tr.as_us()))
+
 
+def iter_speed_tests(db_path: str, tr: TimeRange) -> Iterator[sqlite3.Row]:
+    """Streaming variant of query_speed_tests (see _stream_rows)."""
+    return _stream_rows(db_path, _SQL_QUERY_SPEED_TESTS, tr.as_us())
 
-def query_connectivity_periods(db_path: str, tr: TimeRange, is_up: bool | None = None):
+
+def _connectivity_periods_query(tr: TimeRange, is_up: bool | None) -> tuple[str, tuple]:
+    start_us, end_us = tr.as_us()
     where_is_up = ""
-    params = [tr.end_iso, tr.start_iso]
+    params = [end_us, start_us]
     if is_up is not None:
         where_is_up = " AND is_up = ?"
         params.append(1 if is_up else 0)
+    sql = f"""
+        SELECT {_iso_col("started_at")}, {_iso_col("ended_at")}, is_up
+        FROM connectivity_periods
+        WHERE started_at_us < ?
+          AND (ended_at_us IS NULL OR ended_at_us > ?)
+          {where_is_up}
+        ORDER BY started_at_us ASC
+    """
+    return sql, tuple(params)
+
+
+def query_connectivity_periods(db_path: str, tr: TimeRange, is_up: bool | None = None) -> list[sqlite3.Row]:
+    sql, params = _connectivity_periods_query(tr, is_up)
     with db_conn(db_path) as conn:
-        rows = conn.execute(
-            f"""
-            SELECT started_at, ended_at, is_up
-            FROM connectivity_periods
-            WHERE started_at < ?
-              AND (ended_at IS NULL OR ended_at > ?)
-              {where_is_up}
-            ORDER BY started_at ASC
-            """,
-            tuple(params),
-        ).fetchall()
-        return [dict(r) for r in rows]
+        return conn.execute(sql, params).fetchall()
+
 
+def report_downtime_us(db_path: str, tr: TimeRange, now_iso: str | None = None) -> tuple[int, int]:
+    """(incident count, downtime in µs) of down periods clipped to the range, aggregated in SQLite.
 
-def query_connectivity_checks(db_path: str, tr: TimeRange):
+    Open periods count up to now (never past the range end).
+    """
+    start_us, end_us = tr.as_us()
+    now_us = _iso_to_us(now_iso) if now_iso else _utc_now_us()
     with db_conn(db_path) as conn:
-        rows = conn.execute(
+        row = conn.execute(
             """
-            SELECT checked_at, is_up, latency_ms
-            FROM connectivity_checks
-            WHERE checked_at >= ? AND checked_at <= ?
-            ORDER BY checked_at ASC
+            SELECT COUNT(*),
+                   COALESCE(SUM(MAX(0, MIN(COALESCE(ended_at_us, :now), :end) - MAX(started_at_us, :start))), 0)
+            FROM connectivity_periods
+            WHERE is_up = 0
+              AND started_at_us < :end
+              AND (ended_at_us IS NULL OR ended_at_us > :start)
             """,
-            (tr.start_iso, tr.end_iso),
-        ).fetchall()
-        return [dict(r) for r in rows]
+            {"start": start_us, "end": end_us, "now": now_us},
+        ).fetchone()
+        return row[0], row[1]
+
+
+def iter_connectivity_periods(db_path: str, tr: TimeRange, is_up: bool | None = None) -> Iterator[sqlite3.Row]:
+    """Streaming variant of query_connectivity_periods (see _stream_rows)."""
+    sql, params = _connectivity_periods_query(tr, is_up)
+    return _stream_rows(db_path, sql, params)
+
 
+def query_connectivity_checks(db_path: str, tr: TimeRange) -> list[sqlite3.Row]:
+    with db_conn(db_path) as conn:
+        return conn.execute(_SQL_QUERY_CHECKS, tr.as_us()).fetchall()
+
+
+def iter_connectivity_checks(db_path: str, tr: TimeRange) -> Iterator[sqlite3.Row]:
+    """Streaming variant of query_connectivity_checks (see _stream_rows)."""
+    return _stream_rows(db_path, _SQL_QUERY_CHECKS, tr.as_us())
 
-def get_current_blocked_period(db_path: str, test_type: str):
+
+def get_current_blocked_period(db_path: str, test_type: str) -> sqlite3.Row | None:
     """Get the current open blocked period for a test type."""
     with db_conn(db_path) as conn:
         row = conn.execute(
-            """
-            SELECT id, test_type, started_at, ended_at, reason
+            f"""
+            SELECT id, test_type, {_iso_col("started_at")}, {_iso_col("ended_at")}, reason
             FROM blocked_periods
-            WHERE test_type = ? AND ended_at IS NULL
+            WHERE test_type = ? AND ended_at_us IS NULL
             ORDER BY id DESC
             LIMIT 1
             """,
             (test_type,),
         ).fetchone()
-        return dict(row) if row else None
+        return row
 
 
 def start_blocked_period(db_path: str, test_type: str, reason: str, now_iso: str | None = None) -> None:
     """Start a new blocked period if not already in one."""
-    now_iso = now_iso or _utc_now_iso()
+    now_us = _iso_to_us(now_iso) if now_iso else _utc_now_us()
     current = get_current_blocked_period(db_path, test_type)
     if current is not None:
         # Already in a blocked period
         return
     with db_conn(db_path) as conn:
         conn.execute(
-            "INSERT INTO blocked_periods(test_type, started_at, ended_at, reason) VALUES (?,?,?,?)",
-            (test_type, now_iso, None, reason),
+            "INSERT INTO blocked_periods(test_type, started_at_us, ended_at_us, reason) VALUES (?,?,?,?)",
+            (test_type, now_us, None, reason),
         )
 
 
 def end_blocked_period(db_path: str, test_type: str, now_iso: str | None = None) -> None:
     """End the current blocked period if there is one."""
-    now_iso = now_iso or _utc_now_iso()
+    now_us = _iso_to_us(now_iso) if now_iso else _utc_now_us()
     current = get_current_blocked_period(db_path, test_type)
     if current is None:
         return
     with db_conn(db_path) as conn:
         conn.execute(
-            "UPDATE blocked_periods SET ended_at = ? WHERE id = ?",
-            (now_iso, current["id"]),
+            "UPDATE blocked_periods SET ended_at_us = ? WHERE id = ?",
+            (now_us, current["id"]),
         )
 
 
-def query_blocked_periods(db_path: str, tr: TimeRange, test_type: str | None = None):
+def query_blocked_periods(db_path: str, tr: TimeRange, test_type: str | None = None) -> list[sqlite3.Row]:
     """Query blocked periods within a time range."""
+    start_us, end_us = tr.as_us()
     where_type = ""
-    params: list = [tr.end_iso, tr.start_iso]
+    params: list = [end_us, start_us]
     if test_type is not None:
         where_type = " AND test_type = ?"
         params.append(test_type)
     with db_conn(db_path) as conn:
-        rows = conn.execute(
+        cur = conn.execute(
             f"""
-            SELECT test_type, started_at, ended_at, reason
+            SELECT test_type, {_iso_col("started_at")}, {_iso_col("ended_at")}, reason
             FROM blocked_periods
-            WHERE started_at < ?
-              AND (ended_at IS NULL OR ended_at > ?)
+            WHERE started_at_us < ?
+              AND (ended_at_us IS NULL OR ended_at_us > ?)
               {where_type}
-            ORDER BY started_at ASC
+            ORDER BY started_at_us ASC
             """,
             tuple(params),
-        ).fetchall()
-        return [dict(r) for r in rows]
+        )
+        return cur.fetchall()
@@ -1,15 +1,59 @@
 from __future__ import annotations
 
+import atexit
 import logging
-import smtplib
-import ssl
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import string
+import threading
+from typing import TYPE_CHECKING
 
 from .config import AppConfig
 
+if TYPE_CHECKING:
+    # smtplib/ssl/email.mime are imported lazily: most installs never send mail.
+    import smtplib
+    import ssl
+
 log = logging.getLogger(__name__)
 
+# Reused SMTP session (connect + STARTTLS + login happen once, NOOP-probed before reuse).
+_client_lock = threading.Lock()
+_client: smtplib.SMTP | None = None
+
+# Built lazily: create_default_context() loads and parses the system CA bundle.
+_SSL_CTX: ssl.SSLContext | None = None
+_CTX_LOCK = threading.Lock()
+
+
+def _ssl_ctx() -> ssl.SSLContext:
+    global _SSL_CTX
+    if _SSL_CTX is None:
+        import ssl
+
+        with _CTX_LOCK:
+            if _SSL_CTX is None:
+                _SSL_CTX = ssl.create_default_context()
+    return _SSL_CTX
+
+
+_TEXT_TMPL = string.Template(
+    "Wykryto awarię internetu.\n\n"
+    "Początek awarii: $started\n"
+    "Koniec awarii: $ended\n"
+    "Czas trwania: $duration"
+)
+_HTML_TMPL = string.Template("""
+    <html>
+    <body>
+    <h2 style="color: #dc2626;">Awaria internetu</h2>
+    <table style="border-collapse: collapse;">
+      <tr><td style="padding: 4px 12px 4px 0;"><strong>Początek:</strong></td><td>$started</td></tr>
+      <tr><td style="padding: 4px 12px 4px 0;"><strong>Koniec:</strong></td><td>$ended</td></tr>
+      <tr><td style="padding: 4px 12px 4px 0;"><strong>Czas trwania:</strong></td><td><strong>$duration</strong></td></tr>
+    </table>
+    </body>
+    </html>
+    """)
+
 
 def _format_duration(seconds: float) -> str:
     """Format duration in human-readable form."""
@@ -41,24 +85,8 @@ def send_outage_notification(
     duration_str = _format_duration(duration_seconds)
     subject = f"Awaria internetu ({duration_str})"
 
-    body_text = (
-        f"Wykryto awarię internetu.\n\n"
-        f"Początek awarii: {started_at}\n"
-        f"Koniec awarii: {ended_at}\n"
-        f"Czas trwania: {duration_str}"
-    )
-    body_html = f"""
-    <html>
-    <body>
-    <h2 style="color: #dc2626;">Awaria internetu</h2>
-    <table style="border-collapse: collapse;">
-      <tr><td style="padding: 4px 12px 4px 0;"><strong>Początek:</strong></td><td>{started_at}</td></tr>
-      <tr><td style="padding: 4px 12px 4px 0;"><strong>Koniec:</strong></td><td>{ended_at}</td></tr>
-      <tr><td style="padding: 4px 12px 4px 0;"><strong>Czas trwania:</strong></td><td><strong>{duration_str}</strong></td></tr>
-    </table>
-    </body>
-    </html>
-    """
+    body_text = _TEXT_TMPL.substitute(started=started_at, ended=ended_at, duration=duration_str)
+    body_html = _HTML_TMPL.substitute(started=started_at, ended=ended_at, duration=duration_str)
 
     return _send_email(cfg, subject, body_text, body_html)
 
@@ -70,6 +98,9 @@ def _send_email(
     body_html: str,
 ) -> bool:
     """Send email via SMTP."""
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
     try:
         msg = MIMEMultipart("alternative")
         msg["Subject"] = subject
@@ -79,16 +110,13 @@ def _send_email(
         msg.attach(MIMEText(body_text, "plain", "utf-8"))
         msg.attach(MIMEText(body_html, "html", "utf-8"))
 
-        if cfg.smtp_use_tls:
-            context = ssl.create_default_context()
-            with smtplib.SMTP(cfg.smtp_host, cfg.smtp_port, timeout=30) as server:
-                server.starttls(context=context)
-                server.login(cfg.smtp_user, cfg.smtp_password)
-                server.sendmail(cfg.smtp_from or cfg.smtp_user, [cfg.smtp_to], msg.as_string())
-        else:
-            with smtplib.SMTP(cfg.smtp_host, cfg.smtp_port, timeout=30) as server:
-                server.login(cfg.smtp_user, cfg.smtp_password)
+        with _client_lock:
+            server = _get_client(cfg)
+            try:
                 server.sendmail(cfg.smtp_from or cfg.smtp_user, [cfg.smtp_to], msg.as_string())
+            except Exception:
+                _drop_client()
+                raise
 
         log.info("Email notification sent: %s", subject)
         return True
@@ -96,3 +124,49 @@ def _send_email(
     except Exception as e:
         log.error("Failed to send email notification: %s", e)
         return False
+
+
+def _get_client(cfg: AppConfig) -> smtplib.SMTP:
+    """Return a live SMTP session, reconnecting if the cached one went stale.
+
+    Caller must hold _client_lock.
+    """
+    import smtplib
+
+    global _client
+    if _client is not None:
+        try:
+            _client.noop()
+            return _client
+        except Exception:
+            _drop_client()
+
+    server = smtplib.SMTP(cfg.smtp_host, cfg.smtp_port, timeout=30)
+    try:
+        if cfg.smtp_use_tls:
+            server.starttls(context=_ssl_ctx())
+        server.login(cfg.smtp_user, cfg.smtp_password)
+    except Exception:
+        server.close()
+        raise
+    _client = server
+    return server
+
+
+def _drop_client() -> None:
+    global _client
+    if _client is None:
+        return
+    try:
+        _client.quit()
+    except Exception:
+        _client.close()
+    _client = None
+
+
+def _close_client() -> None:
+    with _client_lock:
+        _drop_client()
+
+
+atexit.register(_close_client)
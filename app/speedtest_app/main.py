@@ -2,60 +2,100 @@ from __future__ import annotations
 
 import asyncio
 import csv
-import io
+import hashlib
+import itertools
 import os
-import uuid
-from datetime import datetime
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Generator
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
-from .config import AppConfig
+from .config import get_config
 from .db import (
     TimeRange,
-    ensure_db,
-    ensure_default_setting,
-    get_current_connectivity_period,
-    get_last_speed_test,
-    get_last_success_speed_test,
+    bootstrap_db,
+    get_status_rows,
+    iter_connectivity_checks,
+    iter_connectivity_periods,
+    iter_speed_tests,
     query_connectivity_periods,
     query_connectivity_checks,
     query_speed_tests,
-    set_setting,
+    report_downtime_us,
+    set_settings_bulk,
     get_settings,
 )
 from .runtime import get_runtime, init_runtime
-from .scheduler import RunningState, connectivity_loop, run_speedtest_once, speedtest_loop
-from .telemetry import active_heartbeat_loop, send_startup_event
-from .time_utils import parse_dt, parse_range, to_iso_z, to_local_display, to_local_iso, utc_now
+from .scheduler import RunningState, connectivity_loop, db_maintenance_loop, run_speedtest_once, speedtest_loop
+from .telemetry import (
+    active_heartbeat_loop,
+    close_client as close_telemetry_client,
+    ensure_install_id,
+    send_startup_event,
+)
+from .time_utils import (
+    iso_z_to_local_display,
+    local_tz,
+    parse_range,
+    to_iso_z,
+    to_local_display,
+    to_local_iso,
+    to_local_iso_fast,
+    utc_now,
+)
 
 
 DEFAULT_SPEEDTEST_MODE = "speedtest.net"
+_VALID_MODES: frozenset[str] = frozenset({"url", "speedtest.net", "speedtest.pl"})
+# Settings keys backing ConfigResponse, read together by _build_effective_config.
+_CONFIG_KEYS: tuple[str, ...] = (
+    "connect_target",
+    "connect_interval_seconds",
+    "speedtest_mode",
+    "speedtest_url",
+    "speedtest_interval_seconds",
+    "speedtest_duration_seconds",
+    "connectivity_check_buffer_seconds",
+    "connectivity_check_buffer_max",
+    "ping_timeout_ms",
+    "ping_enabled",
+    "speed_enabled",
+    "ping_schedules",
+    "speed_schedules",
+    "telemetry_enabled",
+)
+
+cfg = get_config()
+
+
+def _bootstrap_db() -> None:
+    """Create/upgrade the schema and seed default settings (run once at startup)."""
+    bootstrap_db(
+        cfg.db_path,
+        {
+            "connect_target": cfg.connect_target,
+            "connect_interval_seconds": str(cfg.connect_interval_seconds),
+            "speedtest_mode": DEFAULT_SPEEDTEST_MODE,
+            "speedtest_url": cfg.speedtest_url or "",
+            "speedtest_interval_seconds": str(cfg.speedtest_interval_seconds),
+            "speedtest_duration_seconds": str(cfg.speedtest_duration_seconds),
+            "connectivity_check_buffer_seconds": str(cfg.connectivity_check_buffer_seconds),
+            "connectivity_check_buffer_max": str(cfg.connectivity_check_buffer_max),
+            "ping_timeout_ms": str(cfg.ping_timeout_ms),
+            "ping_enabled": "true",
+            "speed_enabled": "true",
+            "ping_schedules": "[]",
+            "speed_schedules": "[]",
+            "telemetry_enabled": "true" if cfg.telemetry_default_enabled else "false",
+        },
+    )
+    ensure_install_id(cfg.db_path)
 
-cfg = AppConfig()
-ensure_db(cfg.db_path)
-
-ensure_default_setting(cfg.db_path, "connect_target", cfg.connect_target)
-ensure_default_setting(cfg.db_path, "connect_interval_seconds", str(cfg.connect_interval_seconds))
-ensure_default_setting(cfg.db_path, "speedtest_mode", DEFAULT_SPEEDTEST_MODE)
-ensure_default_setting(cfg.db_path, "speedtest_url", cfg.speedtest_url or "")
-ensure_default_setting(cfg.db_path, "speedtest_interval_seconds", str(cfg.speedtest_interval_seconds))
-ensure_default_setting(cfg.db_path, "speedtest_duration_seconds", str(cfg.speedtest_duration_seconds))
-ensure_default_setting(cfg.db_path, "connectivity_check_buffer_seconds", str(cfg.connectivity_check_buffer_seconds))
-ensure_default_setting(cfg.db_path, "connectivity_check_buffer_max", str(cfg.connectivity_check_buffer_max))
-ensure_default_setting(cfg.db_path, "ping_timeout_ms", str(cfg.ping_timeout_ms))
-ensure_default_setting(cfg.db_path, "ping_enabled", "true")
-ensure_default_setting(cfg.db_path, "speed_enabled", "true")
-ensure_default_setting(cfg.db_path, "ping_schedules", "[]")
-ensure_default_setting(cfg.db_path, "speed_schedules", "[]")
-ensure_default_setting(cfg.db_path, "telemetry_enabled", "true" if cfg.telemetry_default_enabled else "false")
-_telemetry_install_id = get_settings(cfg.db_path, ["telemetry_install_id"]).get("telemetry_install_id", "").strip()
-if not _telemetry_install_id:
-    set_setting(cfg.db_path, "telemetry_install_id", uuid.uuid4().hex, now_iso=to_iso_z(utc_now()))
 
 def _read_version() -> str:
     """Odczytaj wersję z pliku VERSION osadzonego w aplikacji."""
@@ -66,15 +106,30 @@ def _read_version() -> str:
         return "dev"
 
 APP_VERSION = _read_version()
-app = FastAPI(title="Speedtest Monitor", version=APP_VERSION)
+app = FastAPI(title="Speedtest Monitor", version=APP_VERSION, default_response_class=ORJSONResponse)
 _BASE_DIR = Path(__file__).resolve().parent.parent
 _STATIC_DIR = _BASE_DIR / "static"
-app.mount("/static", StaticFiles(directory=str(_STATIC_DIR)), name="static")
+
+
+class _CachedStaticFiles(StaticFiles):
+    """StaticFiles with a short browser cache; afterwards ETag revalidation answers 304.
+
+    Asset URLs are not content-hashed, so the window stays short to pick up upgrades.
+    """
+
+    def file_response(self, *args: Any, **kwargs: Any):
+        resp = super().file_response(*args, **kwargs)
+        resp.headers.setdefault("Cache-Control", "public, max-age=300")
+        return resp
+
+
+app.mount("/static", _CachedStaticFiles(directory=str(_STATIC_DIR)), name="static")
 
 
 @app.get("/", include_in_schema=False)
 def index():
-    return FileResponse(str(_STATIC_DIR / "index.html"))
+    # Always revalidated (cheap 304), so a new version's asset links are seen right away.
+    return FileResponse(str(_STATIC_DIR / "index.html"), headers={"Cache-Control": "no-cache"})
 
 
 @app.get("/healthz", include_in_schema=False)
@@ -87,14 +142,25 @@ def api_version():
     return {"version": APP_VERSION}
 
 
+@dataclass(slots=True)
+class _AppState:
+    running_state: RunningState
+    tasks: list[asyncio.Task]
+
+
+# Set by _startup; stays None if startup never ran (or failed before starting tasks).
+app.state.container = None
+
+
 @app.on_event("startup")
 async def _startup() -> None:
+    _bootstrap_db()
     init_runtime()
     state = RunningState(stop=asyncio.Event())
-    app.state.running_state = state
-    app.state.tasks = [
+    tasks = [
         asyncio.create_task(connectivity_loop(cfg, state)),
         asyncio.create_task(speedtest_loop(cfg, state)),
+        asyncio.create_task(db_maintenance_loop(cfg, state)),
         asyncio.create_task(
             send_startup_event(
                 db_path=cfg.db_path,
@@ -112,40 +178,61 @@ async def _startup() -> None:
             )
         ),
     ]
+    app.state.container = _AppState(running_state=state, tasks=tasks)
 
 
 @app.on_event("shutdown")
 async def _shutdown() -> None:
-    state: RunningState | None = getattr(app.state, "running_state", None)
-    if state is None:
-        return
-    state.stop.set()
-    tasks = getattr(app.state, "tasks", [])
-    for t in tasks:
-        t.cancel()
-    if tasks:
-        await asyncio.gather(*tasks, return_exceptions=True)
+    from .network_tools import close_dns_sockets, close_http_clients
+
+    container: _AppState | None = app.state.container
+    if container is not None:
+        container.running_state.stop.set()
+        for t in container.tasks:
+            t.cancel()
+        await asyncio.gather(*container.tasks, return_exceptions=True)
+    await close_http_clients()
+    await close_dns_sockets()
+    await close_telemetry_client()
+
+
+# Part of the /api/status ETag: _cfg_version restarts at 0 with every process.
+_BOOT_ID = os.urandom(8).hex()
+
+
+def _status_etag(current, last_speed, last_speed_ok, rt, tz) -> str:
+    """Fingerprint of everything /api/status renders except "now" (which the UI ignores)."""
+    fingerprint = (
+        _BOOT_ID,
+        _cfg_version,
+        current and (current["id"], current["is_up"]),
+        last_speed and last_speed["id"],
+        last_speed_ok and last_speed_ok["id"],
+        rt.running,
+        rt.running_since_iso,
+        tz,
+    )
+    return '"%s"' % hashlib.blake2b(repr(fingerprint).encode(), digest_size=8).hexdigest()
 
 
 @app.get("/api/status")
-def api_status() -> dict[str, Any]:
-    current = get_current_connectivity_period(cfg.db_path)
-    last_speed = get_last_speed_test(cfg.db_path)
-    last_speed_ok = get_last_success_speed_test(cfg.db_path)
+def api_status(request: Request, response: Response) -> Any:
+    current, last_speed, last_speed_ok = get_status_rows(cfg.db_path)
     eff = _effective_config()
     rt = get_runtime()
+    tz = local_tz()
+
+    # Dashboard polls mostly see nothing new: answer 304 before formatting/serializing.
+    etag = _status_etag(current, last_speed, last_speed_ok, rt, tz)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
 
-    if current:
-        current = dict(current)
-        current["started_at"] = to_local_iso(parse_dt(current["started_at"]))
-        if current.get("ended_at"):
-            current["ended_at"] = to_local_iso(parse_dt(current["ended_at"]))
-    if last_speed:
-        last_speed = dict(last_speed)
-        last_speed["started_at"] = to_local_iso(parse_dt(last_speed["started_at"]))
-    if last_speed_ok:
-        last_speed_ok = dict(last_speed_ok)
-        last_speed_ok["started_at"] = to_local_iso(parse_dt(last_speed_ok["started_at"]))
+    # Rows are fresh dicts: convert in place. The open period has no ended_at, and when the
+    # latest test succeeded last_speed_ok is the same dict, so it is converted only once.
+    for row in (current, last_speed) if last_speed_ok is last_speed else (current, last_speed, last_speed_ok):
+        if row:
+            row["started_at"] = to_local_iso_fast(row["started_at"], tz)
 
     return {
         "now": to_local_iso(utc_now()),
@@ -153,7 +240,7 @@ def api_status() -> dict[str, Any]:
         "last_speed_test": last_speed,
         "last_speed_test_ok": last_speed_ok,
         "speedtest_running": bool(rt.running),
-        "speedtest_running_since": to_local_iso(parse_dt(rt.running_since_iso)) if rt.running_since_iso else None,
+        "speedtest_running_since": to_local_iso_fast(rt.running_since_iso, tz) if rt.running_since_iso else None,
         "config": {
             "connect_target": eff.connect_target,
             "connect_interval_seconds": eff.connect_interval_seconds,
@@ -203,27 +290,50 @@ class ConfigUpdate(BaseModel):
     speed_schedules: str | None = Field(default=None, max_length=8192)
     telemetry_enabled: bool | None = Field(default=None)
 
+    @field_validator("connect_target", "speedtest_mode", "speedtest_url", mode="before")
+    @classmethod
+    def _strip(cls, v: Any) -> Any:
+        return v.strip() if isinstance(v, str) else v
+
+    @field_validator("speedtest_mode")
+    @classmethod
+    def _check_mode(cls, v: str | None) -> str | None:
+        if v is not None and v not in _VALID_MODES:
+            raise ValueError("speedtest_mode must be one of: url, speedtest.net, speedtest.pl")
+        return v
+
+
+# Parsed settings cache; settings only change through api_update_config, which bumps
+# the version. A build that raced with an update is returned but not stored.
+_cfg_lock = threading.Lock()
+_cfg_cache: ConfigResponse | None = None
+_cfg_version = 0
+# Serializes api_update_config's read-patch-write of the cached config.
+_cfg_update_lock = threading.Lock()
+
 
 def _effective_config() -> ConfigResponse:
-    values = get_settings(
-        cfg.db_path,
-        [
-            "connect_target",
-            "connect_interval_seconds",
-            "speedtest_mode",
-            "speedtest_url",
-            "speedtest_interval_seconds",
-            "speedtest_duration_seconds",
-            "connectivity_check_buffer_seconds",
-            "connectivity_check_buffer_max",
-            "ping_timeout_ms",
-            "ping_enabled",
-            "speed_enabled",
-            "ping_schedules",
-            "speed_schedules",
-            "telemetry_enabled",
-        ],
-    )
+    global _cfg_cache
+    with _cfg_lock:
+        if _cfg_cache is not None:
+            return _cfg_cache
+        version = _cfg_version
+    built = _build_effective_config()
+    with _cfg_lock:
+        if version == _cfg_version:
+            _cfg_cache = built
+    return built
+
+
+def _replace_effective_config(new: ConfigResponse) -> None:
+    global _cfg_cache, _cfg_version
+    with _cfg_lock:
+        _cfg_cache = new
+        _cfg_version += 1
+
+
+def _build_effective_config() -> ConfigResponse:
+    values = get_settings(cfg.db_path, _CONFIG_KEYS)
     connect_target = values.get("connect_target", cfg.connect_target)
     try:
         connect_interval = float(values.get("connect_interval_seconds", str(cfg.connect_interval_seconds)))
@@ -231,7 +341,7 @@ def _effective_config() -> ConfigResponse:
         connect_interval = cfg.connect_interval_seconds
 
     speedtest_mode = (values.get("speedtest_mode") or DEFAULT_SPEEDTEST_MODE).strip()
-    if speedtest_mode not in {"url", "speedtest.net", "speedtest.pl"}:
+    if speedtest_mode not in _VALID_MODES:
         speedtest_mode = DEFAULT_SPEEDTEST_MODE
 
     speedtest_url = values.get("speedtest_url", cfg.speedtest_url or "")
@@ -271,7 +381,8 @@ def _effective_config() -> ConfigResponse:
         "true" if cfg.telemetry_default_enabled else "false",
     ).lower() == "true"
 
-    return ConfigResponse(
+    # Every field is already parsed and type-coerced above, so validation is skipped.
+    return ConfigResponse.model_construct(
         connect_target=connect_target,
         connect_interval_seconds=connect_interval,
         speedtest_mode=speedtest_mode,
@@ -297,50 +408,21 @@ def api_get_config():
 
 @app.put("/api/config", response_model=ConfigResponse)
 def api_update_config(update: ConfigUpdate):
-    now_iso = to_iso_z(utc_now())
-    if update.connect_target is not None:
-        set_setting(cfg.db_path, "connect_target", update.connect_target.strip(), now_iso=now_iso)
-    if update.connect_interval_seconds is not None:
-        set_setting(cfg.db_path, "connect_interval_seconds", str(update.connect_interval_seconds), now_iso=now_iso)
-    if update.speedtest_mode is not None:
-        mode = update.speedtest_mode.strip()
-        if mode not in {"url", "speedtest.net", "speedtest.pl"}:
-            raise HTTPException(status_code=400, detail="speedtest_mode must be one of: url, speedtest.net, speedtest.pl")
-        set_setting(cfg.db_path, "speedtest_mode", mode, now_iso=now_iso)
-    if update.speedtest_url is not None:
-        set_setting(cfg.db_path, "speedtest_url", update.speedtest_url.strip(), now_iso=now_iso)
-    if update.speedtest_interval_seconds is not None:
-        set_setting(cfg.db_path, "speedtest_interval_seconds", str(update.speedtest_interval_seconds), now_iso=now_iso)
-    if update.speedtest_duration_seconds is not None:
-        set_setting(cfg.db_path, "speedtest_duration_seconds", str(update.speedtest_duration_seconds), now_iso=now_iso)
-    if update.connectivity_check_buffer_seconds is not None:
-        set_setting(
-            cfg.db_path,
-            "connectivity_check_buffer_seconds",
-            str(update.connectivity_check_buffer_seconds),
-            now_iso=now_iso,
-        )
-    if update.connectivity_check_buffer_max is not None:
-        set_setting(
-            cfg.db_path,
-            "connectivity_check_buffer_max",
-            str(update.connectivity_check_buffer_max),
-            now_iso=now_iso,
-        )
-    if update.ping_timeout_ms is not None:
-        set_setting(cfg.db_path, "ping_timeout_ms", str(update.ping_timeout_ms), now_iso=now_iso)
-    if update.ping_enabled is not None:
-        set_setting(cfg.db_path, "ping_enabled", "true" if update.ping_enabled else "false", now_iso=now_iso)
-    if update.speed_enabled is not None:
-        set_setting(cfg.db_path, "speed_enabled", "true" if update.speed_enabled else "false", now_iso=now_iso)
-    if update.ping_schedules is not None:
-        set_setting(cfg.db_path, "ping_schedules", update.ping_schedules, now_iso=now_iso)
-    if update.speed_schedules is not None:
-        set_setting(cfg.db_path, "speed_schedules", update.speed_schedules, now_iso=now_iso)
-    if update.telemetry_enabled is not None:
-        set_setting(cfg.db_path, "telemetry_enabled", "true" if update.telemetry_enabled else "false", now_iso=now_iso)
-
-    cfg2 = _effective_config()
+    # Strings arrive trimmed by ConfigUpdate's validators; bools are stored as "true"/"false".
+    changes = update.model_dump(exclude_none=True)
+    values = {
+        key: ("true" if value else "false") if isinstance(value, bool) else str(value)
+        for key, value in changes.items()
+    }
+    if values:
+        with _cfg_update_lock:
+            # ConfigUpdate fields share ConfigResponse's names and types, so the new config
+            # is the cached one patched in memory rather than re-read from the settings table.
+            cfg2 = _effective_config().model_copy(update=changes)
+            set_settings_bulk(cfg.db_path, values, now_iso=to_iso_z(utc_now()))
+            _replace_effective_config(cfg2)
+    else:
+        cfg2 = _effective_config()
     if cfg2.connect_interval_seconds <= 0:
         raise HTTPException(status_code=400, detail="connect_interval_seconds must be > 0")
     if cfg2.speedtest_interval_seconds <= 0:
@@ -348,16 +430,19 @@ def api_update_config(update: ConfigUpdate):
     return cfg2
 
 
+# The event loop only keeps weak references to tasks; hold manual runs here until they finish.
+_background_tasks: set[asyncio.Task] = set()
+
+
 @app.post("/api/speedtest/run")
 async def api_speedtest_run():
     rt = get_runtime()
     if rt.running:
         return {"started": False, "running": True}
 
-    async def _run():
-        await run_speedtest_once(cfg)
-
-    asyncio.create_task(_run())
+    task = asyncio.create_task(run_speedtest_once(cfg))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
     return {"started": True, "running": True}
 
 
@@ -365,58 +450,55 @@ async def api_speedtest_run():
 def api_speed(
     from_: str | None = Query(default=None, alias="from"),
     to: str | None = Query(default=None),
-) -> dict[str, Any]:
+) -> ORJSONResponse:
     pr = parse_range(from_, to)
     tr = TimeRange(start_iso=to_iso_z(pr.start), end_iso=to_iso_z(pr.end))
-    items = query_speed_tests(cfg.db_path, tr)
+    tz = local_tz()
+    items = [dict(it) for it in query_speed_tests(cfg.db_path, tr)]
     for it in items:
-        it["started_at"] = to_local_iso(parse_dt(it["started_at"]))
-    return {"range": {"from": to_local_iso(pr.start), "to": to_local_iso(pr.end)}, "items": items}
-
-
-def _overlap_seconds(start: datetime, end: datetime, a: datetime, b: datetime) -> float:
-    left = max(start, a)
-    right = min(end, b)
-    seconds = (right - left).total_seconds()
-    return seconds if seconds > 0 else 0.0
+        it["started_at"] = to_local_iso_fast(it["started_at"], tz)
+    return ORJSONResponse({"range": {"from": to_local_iso(pr.start), "to": to_local_iso(pr.end)}, "items": items})
 
 
 @app.get("/api/outages")
 def api_outages(
     from_: str | None = Query(default=None, alias="from"),
     to: str | None = Query(default=None),
-) -> dict[str, Any]:
+) -> ORJSONResponse:
     pr = parse_range(from_, to)
     tr = TimeRange(start_iso=to_iso_z(pr.start), end_iso=to_iso_z(pr.end))
+    tz = local_tz()
     rows = query_connectivity_periods(cfg.db_path, tr=tr, is_up=False)
+    now_local = to_local_iso(utc_now())
 
     items: list[dict[str, Any]] = []
     for r in rows:
-        started_at = to_local_iso(parse_dt(r["started_at"]))
-        ended_at = to_local_iso(parse_dt(r["ended_at"])) if r["ended_at"] else to_local_iso(utc_now())
+        started_at = to_local_iso_fast(r["started_at"], tz)
+        ended_at = to_local_iso_fast(r["ended_at"], tz) if r["ended_at"] else now_local
         items.append({"started_at": started_at, "ended_at": ended_at})
 
-    return {"range": {"from": to_local_iso(pr.start), "to": to_local_iso(pr.end)}, "items": items}
+    return ORJSONResponse({"range": {"from": to_local_iso(pr.start), "to": to_local_iso(pr.end)}, "items": items})
 
 
 @app.get("/api/pings")
 def api_pings(
     from_: str | None = Query(default=None, alias="from"),
     to: str | None = Query(default=None),
-) -> dict[str, Any]:
+) -> ORJSONResponse:
     pr = parse_range(from_, to)
     tr = TimeRange(start_iso=to_iso_z(pr.start), end_iso=to_iso_z(pr.end))
+    tz = local_tz()
     rows = query_connectivity_checks(cfg.db_path, tr=tr)
     items: list[dict[str, Any]] = []
     for r in rows:
         items.append(
             {
-                "checked_at": to_local_iso(parse_dt(r["checked_at"])),
+                "checked_at": to_local_iso_fast(r["checked_at"], tz),
                 "is_up": r["is_up"],
-                "latency_ms": r.get("latency_ms"),
+                "latency_ms": r["latency_ms"],
             }
         )
-    return {"range": {"from": to_local_iso(pr.start), "to": to_local_iso(pr.end)}, "items": items}
+    return ORJSONResponse({"range": {"from": to_local_iso(pr.start), "to": to_local_iso(pr.end)}, "items": items})
 
 
 @app.get("/api/blocked-periods")
@@ -424,25 +506,27 @@ def api_blocked_periods(
     from_: str | None = Query(default=None, alias="from"),
     to: str | None = Query(default=None),
     test_type: str = Query(default="speed"),
-) -> dict[str, Any]:
+) -> ORJSONResponse:
     """Return blocked periods for a given test type (ping or speed) in the specified range."""
     from .db import query_blocked_periods
 
     pr = parse_range(from_, to)
     tr = TimeRange(start_iso=to_iso_z(pr.start), end_iso=to_iso_z(pr.end))
+    tz = local_tz()
     rows = query_blocked_periods(cfg.db_path, tr=tr, test_type=test_type)
+    now_local = to_local_iso(utc_now())
 
     items: list[dict[str, Any]] = []
     for r in rows:
-        started_at = to_local_iso(parse_dt(r["started_at"]))
-        ended_at = to_local_iso(parse_dt(r["ended_at"])) if r["ended_at"] else to_local_iso(utc_now())
+        started_at = to_local_iso_fast(r["started_at"], tz)
+        ended_at = to_local_iso_fast(r["ended_at"], tz) if r["ended_at"] else now_local
         items.append({
             "started_at": started_at,
             "ended_at": ended_at,
             "reason": r["reason"],
         })
 
-    return {"range": {"from": to_local_iso(pr.start), "to": to_local_iso(pr.end)}, "items": items}
+    return ORJSONResponse({"range": {"from": to_local_iso(pr.start), "to": to_local_iso(pr.end)}, "items": items})
 
 
 @app.get("/api/report/quality")
@@ -452,20 +536,10 @@ def api_report_quality(
 ) -> dict[str, Any]:
     pr = parse_range(from_, to)
     tr = TimeRange(start_iso=to_iso_z(pr.start), end_iso=to_iso_z(pr.end))
-    down_periods = query_connectivity_periods(cfg.db_path, tr=tr, is_up=False)
+    incident_count, downtime_us = report_downtime_us(cfg.db_path, tr=tr)
 
     total_seconds = max(0.0, (pr.end - pr.start).total_seconds())
-    now = utc_now()
-    downtime_seconds = 0.0
-    incident_count = 0
-
-    for p in down_periods:
-        incident_count += 1
-        start_dt = parse_dt(p["started_at"])
-        end_iso = p["ended_at"] or to_iso_z(now)
-        end_dt = parse_dt(end_iso)
-        downtime_seconds += _overlap_seconds(pr.start, pr.end, start_dt, end_dt)
-
+    downtime_seconds = downtime_us / 1_000_000
     downtime_percent = (downtime_seconds / total_seconds * 100.0) if total_seconds > 0 else 0.0
 
     return {
@@ -477,96 +551,140 @@ def api_report_quality(
     }
 
 
-def _csv_response(filename: str, rows: list[list[Any]]) -> StreamingResponse:
-    def iter_csv():
-        buf = io.StringIO()
-        writer = csv.writer(buf)
-        for row in rows:
-            writer.writerow(row)
-            yield buf.getvalue()
-            buf.seek(0)
-            buf.truncate(0)
+class _Echo:
+    """File-like shim: csv.writer.writerow() returns the formatted line as-is."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+# Rows fetched + formatted per worker-thread hop; a sync generator would cost one hop per row.
+_CSV_BATCH_ROWS = 1000
+
+_SPEED_CSV_HEADER = (
+    "started_at",
+    "download_mbps",
+    "upload_mbps",
+    "ping_ms",
+    "server_name",
+    "server_country",
+    "speedtest_mode",
+    "duration_seconds",
+    "bytes_downloaded",
+    "error",
+)
+_OUTAGES_CSV_HEADER = ("started_at", "ended_at")
+_PINGS_CSV_HEADER = ("checked_at", "is_up", "latency_ms")
+
+_SPEED_CSV_HEADERS = {"Content-Disposition": 'attachment; filename="speed.csv"'}
+_OUTAGES_CSV_HEADERS = {"Content-Disposition": 'attachment; filename="outages.csv"'}
+_PINGS_CSV_HEADERS = {"Content-Disposition": 'attachment; filename="pings.csv"'}
+
+
+def _csv_response(
+    headers: dict[str, str],
+    header: tuple[str, ...],
+    rows: Generator[Any, None, None],
+    preformatted: bool = False,
+) -> StreamingResponse:
+    """Stream *rows* as CSV. With *preformatted*, rows are finished "...\r\n" lines."""
+    writer = csv.writer(_Echo())
+    # Batches and the final close both run in worker threads; the lock keeps close()
+    # from touching the generator (and its SQLite connection) mid-batch.
+    rows_lock = threading.Lock()
+
+    def next_chunk() -> str:
+        with rows_lock:
+            batch = itertools.islice(rows, _CSV_BATCH_ROWS)
+            return "".join(batch if preformatted else map(writer.writerow, batch))
+
+    def close_rows() -> None:
+        with rows_lock:
+            rows.close()
+
+    async def iter_csv():
+        try:
+            yield writer.writerow(header)
+            while chunk := await asyncio.to_thread(next_chunk):
+                yield chunk
+        finally:
+            # Client gone or done: release the streaming cursor's connection. Not awaited, so
+            # a cancelled response doesn't wait here; the worker blocks until an in-flight
+            # batch returns, then closes.
+            try:
+                asyncio.get_running_loop().run_in_executor(None, close_rows)
+            except RuntimeError:
+                # Loop/executor already shut down: no batch can still be running.
+                close_rows()
 
     return StreamingResponse(
         iter_csv(),
         media_type="text/csv; charset=utf-8",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        headers=headers,
     )
 
 
 @app.get("/api/export/speed.csv")
-def export_speed_csv(
+async def export_speed_csv(
     from_: str | None = Query(default=None, alias="from"),
     to: str | None = Query(default=None),
 ):
     pr = parse_range(from_, to)
     tr = TimeRange(start_iso=to_iso_z(pr.start), end_iso=to_iso_z(pr.end))
-    items = query_speed_tests(cfg.db_path, tr)
-    rows: list[list[Any]] = [
+    tz = local_tz()
+    rows = (
         [
-            "started_at",
-            "download_mbps",
-            "upload_mbps",
-            "ping_ms",
-            "server_name",
-            "server_country",
-            "speedtest_mode",
-            "duration_seconds",
-            "bytes_downloaded",
-            "error",
+            iso_z_to_local_display(it["started_at"], tz),
+            it["mbps"],
+            it["upload_mbps"],
+            it["ping_ms"],
+            it["server_name"] or "",
+            it["server_country"] or "",
+            it["speedtest_mode"] or "",
+            it["duration_seconds"],
+            it["bytes_downloaded"],
+            it["error"] or "",
         ]
-    ]
-    for it in items:
-        started_local = to_local_display(parse_dt(it["started_at"]))
-        rows.append(
-            [
-                started_local,
-                it["mbps"],
-                it.get("upload_mbps"),
-                it.get("ping_ms"),
-                it.get("server_name") or "",
-                it.get("server_country") or "",
-                it.get("speedtest_mode") or "",
-                it["duration_seconds"],
-                it["bytes_downloaded"],
-                it["error"] or "",
-            ]
-        )
-    return _csv_response("speed.csv", rows)
+        for it in iter_speed_tests(cfg.db_path, tr)
+    )
+    return _csv_response(_SPEED_CSV_HEADERS, _SPEED_CSV_HEADER, rows)
 
 
 @app.get("/api/export/outages.csv")
-def export_outages_csv(
+async def export_outages_csv(
     from_: str | None = Query(default=None, alias="from"),
     to: str | None = Query(default=None),
 ):
     pr = parse_range(from_, to)
     tr = TimeRange(start_iso=to_iso_z(pr.start), end_iso=to_iso_z(pr.end))
-    items = query_connectivity_periods(cfg.db_path, tr=tr, is_up=False)
-    rows: list[list[Any]] = [["started_at", "ended_at"]]
-    now_iso = to_iso_z(utc_now())
-    for it in items:
-        started_local = to_local_display(parse_dt(it["started_at"]))
-        ended_local = to_local_display(parse_dt(it["ended_at"])) if it["ended_at"] else to_local_display(parse_dt(now_iso))
-        rows.append([started_local, ended_local])
-    return _csv_response("outages.csv", rows)
+    tz = local_tz()
+    now_display = to_local_display(utc_now())
+    rows = (
+        [
+            iso_z_to_local_display(it["started_at"], tz),
+            iso_z_to_local_display(it["ended_at"], tz) if it["ended_at"] else now_display,
+        ]
+        for it in iter_connectivity_periods(cfg.db_path, tr=tr, is_up=False)
+    )
+    return _csv_response(_OUTAGES_CSV_HEADERS, _OUTAGES_CSV_HEADER, rows)
 
 
 @app.get("/api/export/pings.csv")
-def export_pings_csv(
+async def export_pings_csv(
     from_: str | None = Query(default=None, alias="from"),
     to: str | None = Query(default=None),
 ):
     pr = parse_range(from_, to)
     tr = TimeRange(start_iso=to_iso_z(pr.start), end_iso=to_iso_z(pr.end))
-    items = query_connectivity_checks(cfg.db_path, tr=tr)
-    rows: list[list[Any]] = [["checked_at", "is_up", "latency_ms"]]
-    for it in items:
-        checked_local = to_local_display(parse_dt(it["checked_at"]))
-        latency = it.get("latency_ms")
-        latency_ms = round(latency) if latency is not None else ""
-        rows.append([checked_local, it["is_up"], latency_ms])
-    return _csv_response("pings.csv", rows)
+    tz = local_tz()
+    # Timestamp and two numbers never need quoting, so skip csv.writer for this
+    # (largest) export and format the lines directly, with csv's "\r\n" terminator.
+    rows = (
+        f"{iso_z_to_local_display(it['checked_at'], tz)},{it['is_up']},"
+        f"{round(it['latency_ms']) if it['latency_ms'] is not None else ''}\r\n"
+        for it in iter_connectivity_checks(cfg.db_path, tr=tr)
+    )
+    return _csv_response(_PINGS_CSV_HEADERS, _PINGS_CSV_HEADER, rows, preformatted=True)
 
 
 # ---------------------------------------------------------------------------
@@ -17,6 +17,33 @@ class OoklaResult:
     error: str | None = None
 
 
+_SERVERS_TTL_SECONDS = 6 * 3600
+_BEST_TTL_SECONDS = 3600
+# mode -> (cached_at_monotonic, value). Scheduled runs otherwise re-download the
+# full server list and re-ping the closest servers on every test.
+_server_cache: dict[str, tuple[float, dict]] = {}
+_best_cache: dict[str, tuple[float, dict]] = {}
+
+
+def _cached(cache: dict[str, tuple[float, dict]], mode: str, ttl: float) -> dict | None:
+    entry = cache.get(mode)
+    if entry is not None and time.monotonic() - entry[0] < ttl:
+        return entry[1]
+    return None
+
+
+def _load_servers(s: speedtest.Speedtest, mode: str) -> None:
+    servers = _cached(_server_cache, mode, _SERVERS_TTL_SECONDS)
+    if servers is not None:
+        s.servers = servers
+        return
+    if mode == "speedtest.pl":
+        _filter_servers_pl(s)
+    else:
+        s.get_servers()
+    _server_cache[mode] = (time.monotonic(), s.servers)
+
+
 def _filter_servers_pl(s: speedtest.Speedtest) -> None:
     s.get_servers()
     filtered: dict[float, list[dict]] = {}
@@ -31,9 +58,14 @@ def run_ookla(mode: str, timeout_seconds: float) -> OoklaResult:
     started = time.monotonic()
     try:
         s = speedtest.Speedtest(secure=True, timeout=timeout_seconds)
-        if mode == "speedtest.pl":
-            _filter_servers_pl(s)
-        best = s.get_best_server()
+        best = _cached(_best_cache, mode, _BEST_TTL_SECONDS)
+        if best is not None:
+            # Re-ping only the previously chosen server (fresh latency, no server list).
+            best = s.get_best_server([best])
+        else:
+            _load_servers(s, mode)
+            best = s.get_best_server()
+            _best_cache[mode] = (time.monotonic(), best)
         ping_ms = best.get("latency")
 
         download_bps = s.download()
@@ -54,6 +86,8 @@ def run_ookla(mode: str, timeout_seconds: float) -> OoklaResult:
             error=None,
         )
     except Exception as e:
+        # The cached server may be the problem; pick again next time.
+        _best_cache.pop(mode, None)
         elapsed = max(0.001, time.monotonic() - started)
         return OoklaResult(
             duration_seconds=elapsed,
@@ -8,10 +8,11 @@ from dataclasses import dataclass
 from datetime import datetime
 
 from .config import AppConfig
-from .connectivity import check_target
+from .connectivity import check_target_async
 from .db import (
     get_settings,
     get_current_connectivity_period,
+    maintenance,
     record_connectivity,
     record_connectivity_check,
     record_connectivity_checks_batch,
@@ -27,6 +28,22 @@ from .time_utils import to_iso_z, to_local_display, parse_dt, utc_now
 
 log = logging.getLogger(__name__)
 
+DB_MAINTENANCE_INTERVAL_SECONDS = 15 * 60
+
+# Settings read on every loop iteration. get_settings() answers from the
+# in-process write-through cache in db.py, so this is a dict lookup per key,
+# and UI changes still apply on the next tick.
+_CONNECTIVITY_KEYS = (
+    "connect_target",
+    "connect_interval_seconds",
+    "connectivity_check_buffer_seconds",
+    "connectivity_check_buffer_max",
+    "ping_timeout_ms",
+    "ping_enabled",
+    "ping_schedules",
+)
+_SPEEDTEST_LOOP_KEYS = ("speedtest_mode", "speedtest_url", "speedtest_interval_seconds", "speed_enabled", "speed_schedules")
+
 
 def _is_blocked_by_schedule(schedules_json: str) -> bool:
     """Check if current time is within any blocking schedule.
@@ -42,9 +59,9 @@ def _is_blocked_by_schedule(schedules_json: str) -> bool:
     if not schedules:
         return False
 
-    now = datetime.now().astimezone()
-    current_day = now.weekday()  # 0=Monday, 6=Sunday
-    current_time = now.strftime("%H:%M")
+    now = time.localtime()
+    current_day = now.tm_wday  # 0=Monday, 6=Sunday
+    current_time = f"{now.tm_hour:02d}:{now.tm_min:02d}"
 
     for sched in schedules:
         days = sched.get("days", [])
@@ -82,9 +99,10 @@ async def _sleep_or_stop(stop: asyncio.Event, seconds: float) -> bool:
 
 def _seconds_until_next_aligned(interval_seconds: float) -> float:
     interval_seconds = max(0.1, float(interval_seconds))
-    now = datetime.now().astimezone()
-    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    elapsed = (now - midnight).total_seconds()
+    # Sekundy od lokalnej północy bez budowania obiektów datetime.
+    now_ts = time.time()
+    local_ts = now_ts + time.localtime(now_ts).tm_gmtoff
+    elapsed = local_ts % 86400.0
     remainder = elapsed % interval_seconds
     # jeśli jesteśmy "na granicy" to planuj następny tick, nie natychmiast
     if remainder < 0.01:
@@ -129,7 +147,8 @@ async def run_speedtest_once(cfg: AppConfig) -> None:
                     duration_seconds = result.duration_seconds
                     mbps = result.download_mbps
                     bytes_downloaded = 0
-                    record_speed_test(
+                    await asyncio.to_thread(
+                        record_speed_test,
                         cfg.db_path,
                         started_at_iso=started_at_iso,
                         duration_seconds=duration_seconds,
@@ -145,11 +164,11 @@ async def run_speedtest_once(cfg: AppConfig) -> None:
                     return
                 else:
                     if speedtest_url:
-                        result = await asyncio.to_thread(
-                            run_speed_test,
+                        result = await run_speed_test(
                             speedtest_url,
                             speedtest_duration,
                             cfg.speedtest_timeout_seconds,
+                            cfg.speedtest_parallel_connections,
                         )
                         error = result.error
                         bytes_downloaded = result.bytes_downloaded
@@ -158,7 +177,8 @@ async def run_speedtest_once(cfg: AppConfig) -> None:
                     else:
                         error = "speedtest_url not set (skipped)"
 
-            record_speed_test(
+            await asyncio.to_thread(
+                record_speed_test,
                 cfg.db_path,
                 started_at_iso=started_at_iso,
                 duration_seconds=duration_seconds,
@@ -174,7 +194,7 @@ async def run_speedtest_once(cfg: AppConfig) -> None:
 
 async def connectivity_loop(cfg: AppConfig, state: RunningState) -> None:
     last_is_up: bool | None = None
-    outage_started_at: str | None = None
+    outage_started_dt: datetime | None = None
     pending_checks: list[tuple[str, bool, float | None]] = []
     last_flush_ts = time.monotonic()
 
@@ -191,22 +211,11 @@ async def connectivity_loop(cfg: AppConfig, state: RunningState) -> None:
     if current_period is not None:
         last_is_up = bool(current_period["is_up"])
         if not last_is_up:
-            outage_started_at = current_period["started_at"]
+            outage_started_dt = parse_dt(current_period["started_at"])
 
     try:
         while not state.stop.is_set():
-            values = get_settings(
-                cfg.db_path,
-                [
-                    "connect_target",
-                    "connect_interval_seconds",
-                    "connectivity_check_buffer_seconds",
-                    "connectivity_check_buffer_max",
-                    "ping_timeout_ms",
-                    "ping_enabled",
-                    "ping_schedules",
-                ],
-            )
+            values = get_settings(cfg.db_path, _CONNECTIVITY_KEYS)
 
             # Check if ping is enabled
             ping_enabled = values.get("ping_enabled", "true").lower() == "true"
@@ -255,38 +264,38 @@ async def connectivity_loop(cfg: AppConfig, state: RunningState) -> None:
             timeout_seconds = max(0.05, ping_timeout_ms / 1000.0)
 
             t0 = time.perf_counter()
-            is_up = await asyncio.to_thread(
-                check_target,
-                connect_target,
-                cfg.connect_default_port,
-                timeout_seconds,
-            )
+            is_up = await check_target_async(connect_target, cfg.connect_default_port, timeout_seconds)
             dt_ms = (time.perf_counter() - t0) * 1000.0
-            now_iso = to_iso_z(utc_now())
+            now_dt = utc_now()
+            now_iso = to_iso_z(now_dt)
             if buffer_seconds <= 0 and buffer_max <= 1:
-                record_connectivity_check(cfg.db_path, is_up=is_up, checked_at_iso=now_iso, latency_ms=dt_ms)
+                await asyncio.to_thread(
+                    record_connectivity_check, cfg.db_path, is_up=is_up, checked_at_iso=now_iso, latency_ms=dt_ms
+                )
             else:
                 pending_checks.append((now_iso, is_up, dt_ms))
                 if len(pending_checks) >= buffer_max or (time.monotonic() - last_flush_ts) >= buffer_seconds:
-                    _flush_pending()
-            record_connectivity(cfg.db_path, is_up=is_up, now_iso=now_iso)
+                    batch, pending_checks = pending_checks, []
+                    last_flush_ts = time.monotonic()
+                    await asyncio.to_thread(record_connectivity_checks_batch, cfg.db_path, batch)
+            # Okresy zmieniają się tylko przy przejściu up/down; bez zmiany nie ma czego zapisywać.
+            if is_up != last_is_up:
+                await asyncio.to_thread(record_connectivity, cfg.db_path, is_up, now_iso)
 
             # Detect state changes and send email notifications.
             if last_is_up is not None and is_up != last_is_up:
                 if not is_up:
                     # Internet went down - remember outage start time.
-                    outage_started_at = now_iso
-                    log.info("Internet outage detected at %s", to_local_display(parse_dt(now_iso)))
+                    outage_started_dt = now_dt
+                    log.info("Internet outage detected at %s", to_local_display(now_dt))
                 else:
                     # Internet restored - send notification if outage was long enough.
-                    ended_local = to_local_display(parse_dt(now_iso))
-                    started_local = to_local_display(parse_dt(outage_started_at)) if outage_started_at else "?"
+                    ended_local = to_local_display(now_dt)
+                    started_local = to_local_display(outage_started_dt) if outage_started_dt else "?"
                     log.info("Internet restored at %s", ended_local)
 
-                    if cfg.smtp_enabled and outage_started_at:
-                        outage_start_dt = parse_dt(outage_started_at)
-                        outage_end_dt = parse_dt(now_iso)
-                        outage_duration_seconds = (outage_end_dt - outage_start_dt).total_seconds()
+                    if cfg.smtp_enabled and outage_started_dt:
+                        outage_duration_seconds = (now_dt - outage_started_dt).total_seconds()
 
                         if outage_duration_seconds >= cfg.smtp_min_outage_seconds:
                             log.info(
@@ -304,7 +313,7 @@ async def connectivity_loop(cfg: AppConfig, state: RunningState) -> None:
                                 cfg.smtp_min_outage_seconds,
                             )
 
-                    outage_started_at = None
+                    outage_started_dt = None
 
             last_is_up = is_up
 
@@ -318,10 +327,7 @@ async def connectivity_loop(cfg: AppConfig, state: RunningState) -> None:
 
 async def speedtest_loop(cfg: AppConfig, state: RunningState) -> None:
     while not state.stop.is_set():
-        values = get_settings(
-            cfg.db_path,
-            ["speedtest_mode", "speedtest_url", "speedtest_interval_seconds", "speed_enabled", "speed_schedules"],
-        )
+        values = get_settings(cfg.db_path, _SPEEDTEST_LOOP_KEYS)
 
         # Check if speed test is enabled
         speed_enabled = values.get("speed_enabled", "true").lower() == "true"
@@ -356,3 +362,18 @@ async def speedtest_loop(cfg: AppConfig, state: RunningState) -> None:
         stopped = await _sleep_or_stop(state.stop, _seconds_until_next_aligned(interval_seconds))
         if stopped:
             return
+
+
+async def db_maintenance_loop(cfg: AppConfig, state: RunningState) -> None:
+    # Stały rytm od monotonicznej kotwicy: czas trwania maintenance nie przesuwa kolejnych uruchomień.
+    next_run = time.monotonic()
+    while not state.stop.is_set():
+        next_run += DB_MAINTENANCE_INTERVAL_SECONDS
+        stopped = await _sleep_or_stop(state.stop, next_run - time.monotonic())
+        if stopped:
+            return
+        try:
+            # wal_checkpoint(TRUNCATE) may wait on readers; keep it off the event loop.
+            await asyncio.to_thread(maintenance, cfg.db_path)
+        except Exception:
+            log.exception("SQLite maintenance failed")
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import random
 import uuid
 from datetime import datetime, timedelta
 
 import httpx
+import orjson
 
 from .db import get_settings, set_setting
 from .time_utils import parse_dt, to_iso_z, utc_now
@@ -19,9 +21,34 @@ TELEMETRY_LAST_ACTIVE_AT_KEY = "telemetry_last_active_at"
 
 _ACTIVE_MIN_INTERVAL = timedelta(hours=23)
 _ACTIVE_CHECK_INTERVAL_SECONDS = 3600
+_DISABLED_CHECK_INTERVAL_SECONDS = 86400
 _ACTIVE_INITIAL_JITTER_SECONDS_MAX = 5 * 60
+_JSON_HEADERS = {"Content-Type": "application/json"}
 
+# Shared by the startup event and the heartbeat, so back-to-back events reuse
+# one pooled connection instead of building a client (and TLS context) each time.
+_client: httpx.AsyncClient | None = None
 
+
+def _get_client(timeout_seconds: float) -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=timeout_seconds,
+            http2=True,
+            limits=httpx.Limits(max_connections=1, max_keepalive_connections=1, keepalive_expiry=300),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.aclose()
+
+
+@functools.lru_cache(maxsize=32)
 def _as_bool(value: str | None, default: bool) -> bool:
     if value is None:
         return default
@@ -37,18 +64,26 @@ def ensure_install_id(db_path: str, now_iso: str | None = None) -> str:
     return new_id
 
 
-def is_enabled(db_path: str, default_enabled: bool) -> bool:
-    raw = get_settings(db_path, [TELEMETRY_ENABLED_KEY]).get(TELEMETRY_ENABLED_KEY)
-    return _as_bool(raw, default_enabled)
+def _load_telemetry_state(db_path: str, default_enabled: bool) -> tuple[bool, str]:
+    values = get_settings(db_path, [TELEMETRY_ENABLED_KEY, TELEMETRY_INSTALL_ID_KEY])
+    return _as_bool(values.get(TELEMETRY_ENABLED_KEY), default_enabled), values.get(TELEMETRY_INSTALL_ID_KEY, "").strip()
 
 
-def _should_send_active(db_path: str, now: datetime) -> bool:
-    raw = get_settings(db_path, [TELEMETRY_LAST_ACTIVE_AT_KEY]).get(TELEMETRY_LAST_ACTIVE_AT_KEY, "").strip()
-    if not raw:
-        return True
+# The last-active timestamp only changes once a day; parse it once.
+@functools.lru_cache(maxsize=1)
+def _parse_last_active(raw: str) -> datetime | None:
     try:
-        last_dt = parse_dt(raw)
+        return parse_dt(raw)
     except Exception:
+        return None
+
+
+def _should_send_active(raw_last_active: str | None, now: datetime) -> bool:
+    raw = (raw_last_active or "").strip()
+    if not raw:
+        return True
+    last_dt = _parse_last_active(raw)
+    if last_dt is None:
         return True
     return (now - last_dt) >= _ACTIVE_MIN_INTERVAL
 
@@ -61,11 +96,13 @@ async def _send_event(
     timeout_seconds: float,
     event: str,
 ) -> None:
-    if not is_enabled(db_path, default_enabled):
+    enabled, install_id = _load_telemetry_state(db_path, default_enabled)
+    if not enabled:
         return
 
     now_iso = to_iso_z(utc_now())
-    install_id = ensure_install_id(db_path, now_iso=now_iso)
+    if not install_id:
+        install_id = ensure_install_id(db_path, now_iso=now_iso)
     payload = {
         "event": event,
         "install_id": install_id,
@@ -73,10 +110,15 @@ async def _send_event(
     }
 
     try:
-        async with httpx.AsyncClient(timeout=timeout_seconds) as client:
-            resp = await client.post(DEFAULT_TELEMETRY_ENDPOINT, json=payload)
-            if 200 <= resp.status_code < 300 and event == "app_active":
-                set_setting(db_path, TELEMETRY_LAST_ACTIVE_AT_KEY, now_iso, now_iso=now_iso)
+        client = _get_client(timeout_seconds)
+        resp = await client.post(
+            DEFAULT_TELEMETRY_ENDPOINT,
+            content=orjson.dumps(payload),
+            headers=_JSON_HEADERS,
+            timeout=timeout_seconds,
+        )
+        if 200 <= resp.status_code < 300 and event == "app_active":
+            set_setting(db_path, TELEMETRY_LAST_ACTIVE_AT_KEY, now_iso, now_iso=now_iso)
     except Exception:
         # Telemetry is best-effort and must never impact app startup.
         return
@@ -107,8 +149,11 @@ async def active_heartbeat_loop(
 ) -> None:
     await asyncio.sleep(random.uniform(0.0, float(_ACTIVE_INITIAL_JITTER_SECONDS_MAX)))
     while True:
-        now = utc_now()
-        if is_enabled(db_path, default_enabled) and _should_send_active(db_path, now):
+        values = get_settings(db_path, [TELEMETRY_ENABLED_KEY, TELEMETRY_LAST_ACTIVE_AT_KEY])
+        if not _as_bool(values.get(TELEMETRY_ENABLED_KEY), default_enabled):
+            await asyncio.sleep(_DISABLED_CHECK_INTERVAL_SECONDS)
+            continue
+        if _should_send_active(values.get(TELEMETRY_LAST_ACTIVE_AT_KEY), utc_now()):
             await _send_event(
                 db_path=db_path,
                 app_version=app_version,
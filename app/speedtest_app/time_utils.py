@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import functools
 import os
 import time
-from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import NamedTuple
 
 
 def _init_tz() -> None:
@@ -25,14 +26,24 @@ def local_now() -> datetime:
     return datetime.now().astimezone()
 
 
+# Fixed-offset zones keyed by the current UTC offset: same tzinfo that
+# datetime.now().astimezone() yields, but a DST switch still gives a new one.
+_local_tz_by_offset: dict[int, timezone] = {}
+
+
 def local_tz():
-    return local_now().tzinfo or timezone.utc
+    lt = time.localtime()
+    tz = _local_tz_by_offset.get(lt.tm_gmtoff)
+    if tz is None:
+        tz = _local_tz_by_offset[lt.tm_gmtoff] = timezone(timedelta(seconds=lt.tm_gmtoff), lt.tm_zone)
+    return tz
 
 
 def to_iso_z(dt: datetime) -> str:
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+    if dt.tzinfo is not timezone.utc:
+        dt = dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+    # isoformat() of a UTC datetime always ends in "+00:00"; swap the fixed suffix.
+    return dt.isoformat()[:-6] + "Z"
 
 
 def to_local_iso(dt: datetime) -> str:
@@ -45,6 +56,20 @@ def to_local_iso(dt: datetime) -> str:
     return d.replace(tzinfo=None).isoformat()
 
 
+@functools.lru_cache(maxsize=4096)
+def _iso_z_to_local_iso(value: str, tz) -> str:
+    return parse_dt(value).astimezone(tz).replace(microsecond=0, tzinfo=None).isoformat()
+
+
+def to_local_iso_fast(value: str, tz: tzinfo | None = None) -> str:
+    """
+    to_local_iso(parse_dt(value)) memoized per string; the UI polls the same rows over and over.
+    The local offset is part of the cache key, so DST switches are picked up. Pass `tz`
+    (from local_tz()) when converting many rows to look it up only once per request.
+    """
+    return _iso_z_to_local_iso(value, tz or local_tz())
+
+
 def to_local_display(dt: datetime) -> str:
     """
     Local time without offset: YYYY-MM-DD HH:MM:SS
@@ -52,10 +77,26 @@ def to_local_display(dt: datetime) -> str:
     return to_local_iso(dt).replace("T", " ")
 
 
+_DISPLAY_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+def iso_z_to_local_display(value: str, tz: tzinfo | None = None) -> str:
+    """
+    Fast path of to_local_display(parse_dt(value)) for DB timestamps (always UTC, "...Z").
+    Pass `tz` (from local_tz()) when converting many rows to look it up only once.
+    """
+    dt = datetime.fromisoformat(value[:-1] + "+00:00")
+    return dt.astimezone(tz or local_tz()).strftime(_DISPLAY_FMT)
+
+
 def parse_dt(value: str) -> datetime:
+    # Query parameters may carry stray whitespace; strip() returns the same object when there is none.
     v = value.strip()
-    if v.endswith("Z"):
-        v = v[:-1] + "+00:00"
+    if v[-1:] == "Z":
+        # Fast path: UTC "...Z" strings (everything the DB and to_iso_z produce).
+        # fromisoformat() understands the "Z" suffix natively since Python 3.11
+        # and returns it as timezone.utc.
+        return datetime.fromisoformat(v)
     dt = datetime.fromisoformat(v)
     if dt.tzinfo is None:
         # traktuj czasy bez strefy jako lokalne (UX w DSM)
@@ -63,8 +104,7 @@ def parse_dt(value: str) -> datetime:
     return dt.astimezone(timezone.utc)
 
 
-@dataclass(frozen=True)
-class ParsedRange:
+class ParsedRange(NamedTuple):
     start: datetime
     end: datetime
 